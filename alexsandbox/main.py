@@ -6,21 +6,34 @@ from gp_framework.Genotype import generate_random_population
 from gp_framework.PopulationManager import *
 from alexsandbox import report as rep
 from gp_framework.FitnessCalculator import FitnessCalculatorStringMatch
+from gp_framework.diversity import AdaptiveMutationController
 
 
 class MyManager(PopulationManager):
 
-    def produce_offspring(self, population: List[Tuple[Genotype, int]]) -> List[Genotype]:
+    def __init__(self, population: List[Genotype],
+                 phenotype_converter: PhenotypeConverter,
+                 fitness_calculator: FitnessCalculator):
+        super().__init__(population, phenotype_converter, fitness_calculator)
+        # Flip about one bit per child on average
+        self._mutation_controller = AdaptiveMutationController(1 / (8 * len(population[0])))
+
+    def produce_offspring(self, population: List[Genotype]) -> Tuple[List[Genotype], List[Genotype]]:
+        # Cloning the best individual collapses the population onto it, so let the controller turn mutation
+        # up as diversity drops
+        judged_population, self._newest_report = self.calculate_population_fitness(population)
+        mutation_factor = self._mutation_controller.update(self._newest_report)
+
         children = []
-        fittest_individual_tuple = max(population, key=itemgetter(1))
+        fittest_individual = max(judged_population, key=itemgetter(1))[0]
         for _ in range(len(population)):
-            child = fittest_individual_tuple[0]
-            child.mutate(.000001)
+            child = Genotype(bytearray(fittest_individual.to_bytes()))
+            child.mutate(mutation_factor)
             children.append(child)
 
-        return children
+        return population, children
 
-    def select_next_generation(self, parents: List[Tuple[Genotype, int]], children: List[Genotype]) -> List[Genotype]:
+    def select_next_generation(self, parents: List[Genotype], children: List[Genotype]) -> List[Genotype]:
         return children
 
 
@@ -57,4 +70,5 @@ def run_selection_process(manager: PopulationManager, iterations: int, name: str
     return reports
 
 
-main()
+if __name__ == "__main__":
+    main()
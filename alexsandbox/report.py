@@ -1,5 +1,3 @@
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import csv
 from gp_framework.FitnessCalculator import *
 
@@ -52,6 +50,9 @@ def generate_plot_from_csv(csv_name: str, elements_per_point: int, output_name:
     :param save_plot: Whether or not to save the plot
     :return:
     """
+    # plotly is slow to import, so only pay for it when a plot is actually made
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
     labels: List[str]
     data: List[List[float]] = []
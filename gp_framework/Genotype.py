@@ -23,6 +23,12 @@ class Genotype:
     def __len__(self):
         return len(self._array_of_bytes)
 
+    def to_bytes(self) -> bytes:
+        """
+        :return: An immutable copy of the underlying representation of this Genotype
+        """
+        return bytes(self._array_of_bytes)
+
     def mutate(self, mutation_factor: float) -> None:
         """
         :param mutation_factor: the probability of having a 1 at any given index in the bitmask should be in [0.0, 1.0]
@@ -1,7 +1,9 @@
 import abc
+from operator import itemgetter
 from typing import List, Tuple
 from abc import abstractmethod
 
+from gp_framework.diversity import calculate_diversity, AdaptiveMutationController
 from gp_framework.FitnessCalculator import FitnessCalculator
 from gp_framework.Genotype import Genotype
 from gp_framework.Genotype import PhenotypeConverter
@@ -11,18 +13,27 @@ class LifecycleReport:
     """
     It's a POJO for whatever data we think is good to keep track of from generation to generation
     """
-    def __init__(self, max_fitness=-1.0, min_fitness=-1.0, mean_fitness=-1.0, solution_found=False):
+    def __init__(self, max_fitness=-1.0, min_fitness=-1.0, mean_fitness=-1.0, solution_found=False,
+                 mean_hamming_distance=-1.0, locus_entropy=-1.0, duplicate_fraction=-1.0):
+        """
+        The diversity measurements are described in gp_framework.diversity. -1.0 means it wasn't measured.
+        """
         self._max_fitness = max_fitness
         self._min_fitness = min_fitness
         self._mean_fitness = mean_fitness
         self._solution_found = solution_found
+        self._mean_hamming_distance = mean_hamming_distance
+        self._locus_entropy = locus_entropy
+        self._duplicate_fraction = duplicate_fraction
 
     def to_list(self):
-        return [self.max_fitness, self.min_fitness, self.mean_fitness]
+        return [self.max_fitness, self.min_fitness, self.mean_fitness,
+                self.mean_hamming_distance, self.locus_entropy, self.duplicate_fraction]
 
     @staticmethod
     def header() -> List[str]:
-        return ['max_fitness', 'min_fitness', 'mean_fitness']
+        return ['max_fitness', 'min_fitness', 'mean_fitness',
+                'mean_hamming_distance', 'locus_entropy', 'duplicate_fraction']
 
     @property
     def max_fitness(self):
@@ -40,6 +51,18 @@ class LifecycleReport:
     def solution_found(self):
         return self._solution_found
 
+    @property
+    def mean_hamming_distance(self):
+        return self._mean_hamming_distance
+
+    @property
+    def locus_entropy(self):
+        return self._locus_entropy
+
+    @property
+    def duplicate_fraction(self):
+        return self._duplicate_fraction
+
 
 class PopulationManager(abc.ABC):
     """
@@ -48,7 +71,8 @@ class PopulationManager(abc.ABC):
     """
     def __init__(self, population: List[Genotype],
                  phenotype_converter: PhenotypeConverter,
-                 fitness_calculator: FitnessCalculator):
+                 fitness_calculator: FitnessCalculator,
+                 evaluator=None):
         """
         todo: should M = len(population)?
         :param population: The starting population
@@ -57,13 +81,30 @@ class PopulationManager(abc.ABC):
         by the fitness_calculator.
         :param fitness_calculator: This is used to judge our solutions
         :param phenotype_converter: converts the Genotypes into Phenotypes for use by fitness_calculator
+        :param evaluator: optional, e.g. a gp_framework.distributed.DistributedEvaluator. If given, its
+        evaluate method is used to judge the population instead of judging it in this process.
         """
         self._population = population
         self._fitness_calculator = fitness_calculator
         self._phenotype_converter = phenotype_converter
+        self._evaluator = evaluator
         # this should be set in produce_offspring or select_next_generation and is returned by lifecycle
         self._newest_report: LifecycleReport = LifecycleReport()
 
+    @property
+    def evaluator(self):
+        return self._evaluator
+
+    @evaluator.setter
+    def evaluator(self, evaluator) -> None:
+        self._evaluator = evaluator
+
+    def __getstate__(self):
+        # An evaluator holds sockets and threads, so it isn't saved with the rest of the manager
+        state = self.__dict__.copy()
+        state["_evaluator"] = None
+        return state
+
     def calculate_population_fitness(self, population: List[Genotype])\
             -> Tuple[List[Tuple[Genotype, float]], LifecycleReport]:
         """
@@ -75,9 +116,13 @@ class PopulationManager(abc.ABC):
         total_fitness = 0
         judged_population = []
 
-        for genotype in population:
-            phenotype = self._phenotype_converter.convert(genotype)
-            fitness = self._fitness_calculator.calculate_fitness(phenotype)
+        if self._evaluator is not None:
+            fitnesses = self._evaluator.evaluate(population)
+        else:
+            fitnesses = [self._fitness_calculator.calculate_fitness(self._phenotype_converter.convert(genotype))
+                         for genotype in population]
+
+        for genotype, fitness in zip(population, fitnesses):
             judged_population.append((genotype, fitness))
             total_fitness += fitness
             if fitness > max_fitness:
@@ -85,7 +130,11 @@ class PopulationManager(abc.ABC):
             if min_fitness < 0 or fitness < min_fitness:
                 min_fitness = fitness
 
-        report = LifecycleReport(max_fitness, min_fitness, total_fitness / len(judged_population), max_fitness == 1.0)
+        # calculate_fitness is unnormalized, so compare against target_fitness. A negative target means there is none.
+        target_fitness = self._fitness_calculator.target_fitness
+        solution_found = 0 <= target_fitness <= max_fitness
+        report = LifecycleReport(max_fitness, min_fitness, total_fitness / len(judged_population), solution_found,
+                                 *calculate_diversity(population))
         return judged_population, report
 
     @abstractmethod
@@ -117,3 +166,39 @@ class PopulationManager(abc.ABC):
         parents, children = self.produce_offspring(self._population)
         self._population = self.select_next_generation(parents, children)
         return self._newest_report
+
+
+class ElitistMutationManager(PopulationManager):
+    """
+    Keeps the fittest Genotype and fills the rest of each generation with mutated copies of it. The
+    mutation_factor is tuned from the population's progress and diversity by an AdaptiveMutationController.
+    """
+    def __init__(self, population: List[Genotype],
+                 phenotype_converter: PhenotypeConverter,
+                 fitness_calculator: FitnessCalculator,
+                 evaluator=None,
+                 mutation_controller: AdaptiveMutationController = None):
+        """
+        :param mutation_controller: defaults to an AdaptiveMutationController that starts out flipping about one
+        bit per child
+        """
+        super().__init__(population, phenotype_converter, fitness_calculator, evaluator)
+        if mutation_controller is None:
+            mutation_controller = AdaptiveMutationController(1 / (8 * len(population[0])) if population else 0.01)
+        self._mutation_controller = mutation_controller
+
+    def produce_offspring(self, population: List[Genotype]) -> Tuple[List[Genotype], List[Genotype]]:
+        judged_population, self._newest_report = self.calculate_population_fitness(population)
+        mutation_factor = self._mutation_controller.update(self._newest_report)
+
+        fittest_individual = max(judged_population, key=itemgetter(1))[0]
+        children = [fittest_individual]
+        for _ in range(len(population) - 1):
+            child = Genotype(bytearray(fittest_individual.to_bytes()))
+            child.mutate(mutation_factor)
+            children.append(child)
+
+        return population, children
+
+    def select_next_generation(self, parents: List[Genotype], children: List[Genotype]) -> List[Genotype]:
+        return children
@@ -0,0 +1,3 @@
+from gp_framework.cli import main
+
+main()
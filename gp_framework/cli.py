@@ -0,0 +1,336 @@
+"""
+Command line entry point: gp_framework <subcommand> ... once installed (pip install .),
+or python -m gp_framework <subcommand> ... from a checkout.
+
+A run is described by a JSON config file, for example
+    {
+        "application": "STRING_MATCH",
+        "application_arguments": ["hello"],
+        "size_of_genotype": 5,
+        "phenotype": "string",
+        "population_size": 10,
+        "generations": 10000,
+        "manager": "gp_framework.PopulationManager:ElitistMutationManager"
+    }
+
+To spread fitness evaluation over other machines, start the run with --listen HOST:PORT --workers N and start
+N workers with python -m gp_framework worker HOST PORT.
+
+Only lightweight modules are imported here. Plotting, serialization and networking are imported by the subcommands
+that use them, so headless runs don't pay for them at startup.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from typing import List, Dict, Tuple
+
+from gp_framework.config import Config
+from gp_framework.FitnessCalculator import Application, FitnessCalculator, create_FitnessCalculator, \
+    InvalidArgumentException
+from gp_framework.Genotype import PhenotypeConverter, StringPhenotypeConverter, ParametersPhenotypeConverter, \
+    generate_random_population
+from gp_framework.PopulationManager import PopulationManager, LifecycleReport
+
+DEFAULT_MANAGER = "gp_framework.PopulationManager:ElitistMutationManager"
+
+
+class InvalidConfigException(Exception):
+    pass
+
+
+def load_settings(path: str) -> Dict[str, any]:
+    try:
+        with open(path, 'r') as file:
+            settings = json.load(file)
+    except (OSError, ValueError) as e:
+        raise InvalidConfigException("Could not read config {}: {}".format(path, e))
+    if not isinstance(settings, dict):
+        raise InvalidConfigException("Config {} must contain a JSON object".format(path))
+    return settings
+
+
+def get_integer_setting(settings: Dict[str, any], name: str, default: int, minimum: int) -> int:
+    value = settings.get(name, default)
+    # bool is a subclass of int, but true isn't a population size
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise InvalidConfigException("{} must be an integer of at least {}, got {!r}".format(name, minimum, value))
+    return value
+
+
+def build_config(settings: Dict[str, any]) -> Config:
+    try:
+        size_of_genotype = settings["size_of_genotype"]
+        application = Application[settings["application"]]
+    except KeyError as e:
+        raise InvalidConfigException("Invalid or missing setting {}".format(e))
+    if not isinstance(size_of_genotype, int) or size_of_genotype <= 0:
+        raise InvalidConfigException("size_of_genotype must be a positive integer")
+    return Config(settings.get("bit_string_length", 8 * size_of_genotype), size_of_genotype, application)
+
+
+def build_phenotype_converter(settings: Dict[str, any]) -> PhenotypeConverter:
+    phenotype = settings.get("phenotype", "string")
+    if phenotype == "string":
+        return StringPhenotypeConverter()
+    elif phenotype == "parameters":
+        if not isinstance(settings.get("number_of_parameters"), int):
+            raise InvalidConfigException("The parameters phenotype needs an integer number_of_parameters setting")
+        return ParametersPhenotypeConverter(settings["number_of_parameters"])
+    raise InvalidConfigException("Unknown phenotype {}".format(phenotype))
+
+
+def build_fitness_calculator(config: Config, settings: Dict[str, any]) -> FitnessCalculator:
+    application_arguments = settings.get("application_arguments")
+    if not isinstance(application_arguments, list) or len(application_arguments) == 0:
+        raise InvalidConfigException("Missing setting application_arguments, a non-empty list")
+    try:
+        fitness_calculator = create_FitnessCalculator(config.application, application_arguments)
+    except (InvalidArgumentException, IndexError, TypeError, ValueError):
+        raise InvalidConfigException("Invalid application_arguments {} for {}".format(
+            application_arguments, config.application.name))
+    if config.application == Application.STRING_MATCH and len(application_arguments[0]) != config.size_of_genotype:
+        # Every phenotype would be the wrong length, and so have a fitness of 0
+        raise InvalidConfigException("size_of_genotype must be {}, the length of the target string".format(
+            len(application_arguments[0])))
+    return fitness_calculator
+
+
+def load_manager_class(settings: Dict[str, any]) -> type:
+    """
+    :param settings: the contents of a config file
+    :return: the PopulationManager subclass named by settings["manager"], as "module:ClassName"
+    """
+    manager = settings.get("manager", DEFAULT_MANAGER)
+    module_name, _, class_name = manager.partition(":")
+    try:
+        manager_class = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise InvalidConfigException("Could not load manager {}: {}".format(manager, e))
+    if not isinstance(manager_class, type) or not issubclass(manager_class, PopulationManager):
+        raise InvalidConfigException("Manager {} is not a PopulationManager".format(manager))
+    return manager_class
+
+
+def build_manager(settings: Dict[str, any], evaluator=None) -> PopulationManager:
+    """
+    :param settings: the contents of a config file
+    :param evaluator: optional, passed on to the PopulationManager to judge the population with
+    :return: a fresh PopulationManager of the class named by settings["manager"], as "module:ClassName"
+    """
+    config = build_config(settings)
+    manager_class = load_manager_class(settings)
+    population = generate_random_population(get_integer_setting(settings, "population_size", 10, 1),
+                                            config.size_of_genotype)
+    manager = manager_class(population, build_phenotype_converter(settings), build_fitness_calculator(config, settings))
+    manager.evaluator = evaluator
+    return manager
+
+
+def start_evaluator(settings: Dict[str, any], address: Tuple[str, int], workers: int):
+    """
+    Listen on address for workers and wait until workers of them have connected
+    :return: a DistributedEvaluator for the converter and calculator described by settings
+    """
+    from gp_framework.distributed import DistributedEvaluator
+    config = build_config(settings)
+    evaluator = DistributedEvaluator(build_phenotype_converter(settings), build_fitness_calculator(config, settings),
+                                     *address)
+    print("Waiting for {} workers on {}:{}".format(workers, *evaluator.address), file=sys.stderr, flush=True)
+    evaluator.wait_for_workers(workers)
+    return evaluator
+
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected HOST:PORT, got {}".format(address))
+
+
+def _save_checkpoint(path: str, manager: PopulationManager, settings: Dict[str, any], generation: int) -> None:
+    from gp_framework import serializer
+    contents = serializer.serialize({"manager": manager, "settings": settings, "generation": generation})
+    # Write beside the checkpoint and then swap it in, so being killed mid-write can't corrupt the old one
+    temporary_path = path + ".tmp"
+    with open(temporary_path, 'w') as file:
+        file.write(contents)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def _load_checkpoint(path: str) -> Tuple[PopulationManager, Dict[str, any], int]:
+    from gp_framework import serializer
+    with open(path, 'r') as file:
+        checkpoint = serializer.deserialize(file.read())
+    return checkpoint["manager"], checkpoint["settings"], checkpoint["generation"]
+
+
+def run_generations(manager: PopulationManager, settings: Dict[str, any], generations: int,
+                    first_generation: int = 0, checkpoint: str = None, checkpoint_every: int = 1000) \
+        -> List[LifecycleReport]:
+    """
+    Run manager until generations have passed or a solution is found, checkpointing along the way if asked to
+    :return: the report of each generation
+    """
+    reports = []
+    for generation in range(first_generation, generations):
+        reports.append(manager.lifecycle())
+        if checkpoint is not None and (generation + 1) % checkpoint_every == 0:
+            _save_checkpoint(checkpoint, manager, settings, generation + 1)
+        if reports[-1].solution_found:
+            break
+    if checkpoint is not None:
+        _save_checkpoint(checkpoint, manager, settings, first_generation + len(reports))
+    return reports
+
+
+def _write_reports(arguments: argparse.Namespace, reports: List[LifecycleReport]) -> None:
+    if arguments.csv is None:
+        return
+    from gp_framework import report as rep
+    rep.generate_csv(arguments.csv, LifecycleReport.header(), [report.to_list() for report in reports])
+    if arguments.plot:
+        rep.generate_plot_from_csv(arguments.csv, os.path.splitext(arguments.csv)[0] + ".html",
+                                   arguments.elements_per_point)
+
+
+def _summarize(reports: List[LifecycleReport]) -> str:
+    if len(reports) == 0:
+        return "0 generations"
+    return "{} generations, max_fitness {}, solution_found {}".format(
+        len(reports), reports[-1].max_fitness, reports[-1].solution_found)
+
+
+def _run(arguments: argparse.Namespace) -> None:
+    settings = load_settings(arguments.config)
+    manager = build_manager(settings)
+    if arguments.listen is not None:
+        manager.evaluator = start_evaluator(settings, arguments.listen, arguments.workers)
+    try:
+        reports = run_generations(manager, settings, get_integer_setting(settings, "generations", 1000, 0),
+                                  checkpoint=arguments.checkpoint, checkpoint_every=arguments.checkpoint_every)
+    finally:
+        if manager.evaluator is not None:
+            manager.evaluator.close()
+    print(_summarize(reports))
+    _write_reports(arguments, reports)
+
+
+def _resume(arguments: argparse.Namespace) -> None:
+    manager, settings, generation = _load_checkpoint(arguments.checkpoint)
+    generations = arguments.generations
+    if generations is None:
+        generations = get_integer_setting(settings, "generations", 1000, 0)
+    if arguments.listen is not None:
+        manager.evaluator = start_evaluator(settings, arguments.listen, arguments.workers)
+    try:
+        reports = run_generations(manager, settings, generations, first_generation=generation,
+                                  checkpoint=arguments.checkpoint, checkpoint_every=arguments.checkpoint_every)
+    finally:
+        if manager.evaluator is not None:
+            manager.evaluator.close()
+    print(_summarize(reports))
+    _write_reports(arguments, reports)
+
+
+def _sweep(arguments: argparse.Namespace) -> None:
+    base_settings = load_settings(arguments.config)
+    for value in arguments.values:
+        settings = dict(base_settings)
+        try:
+            settings[arguments.setting] = json.loads(value)
+        except ValueError:
+            raise InvalidConfigException("Value {} for {} is not valid JSON".format(value, arguments.setting))
+        start = time.perf_counter()
+        generations = get_integer_setting(settings, "generations", 1000, 0)
+        reports = run_generations(build_manager(settings), settings, generations)
+        print("{}={}: {} in {:.3f}s".format(arguments.setting, value, _summarize(reports),
+                                           time.perf_counter() - start))
+
+
+def _benchmark(arguments: argparse.Namespace) -> None:
+    settings = load_settings(arguments.config)
+    timings = []
+    for _ in range(arguments.repeat):
+        manager = build_manager(settings)
+        start = time.perf_counter()
+        for _ in range(arguments.generations):
+            manager.lifecycle()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print("{} generations: best {:.4f}s, {:.1f} generations/s".format(
+        arguments.generations, best, arguments.generations / best if best > 0 else float("inf")))
+
+
+def _worker(arguments: argparse.Namespace) -> None:
+    from gp_framework.distributed import run_worker
+    run_worker(arguments.host, arguments.port, arguments.heartbeat_interval, arguments.connect_timeout)
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--listen", type=_parse_address, metavar="HOST:PORT",
+                        help="evaluate fitness on workers that connect to this address")
+    parser.add_argument("--workers", type=int, default=1, help="workers to wait for before starting, with --listen")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="generations between checkpoints")
+    parser.add_argument("--csv", help="csv file to write the reports to")
+    parser.add_argument("--plot", action="store_true", help="also save an html plot beside the csv")
+    parser.add_argument("--elements-per-point", type=int, default=1, help="reports averaged into each plot point")
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="gp_framework", description="Run genetic algorithms from a config file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the config")
+    run_parser.add_argument("config")
+    run_parser.add_argument("--checkpoint", help="file to save progress to")
+    _add_run_arguments(run_parser)
+    run_parser.set_defaults(function=_run)
+
+    resume_parser = subparsers.add_parser("resume", help="continue a run from its checkpoint")
+    resume_parser.add_argument("checkpoint")
+    resume_parser.add_argument("--generations", type=int, help="total generations, overriding the config")
+    _add_run_arguments(resume_parser)
+    resume_parser.set_defaults(function=_resume)
+
+    sweep_parser = subparsers.add_parser("sweep", help="run the config once for each value of one setting")
+    sweep_parser.add_argument("config")
+    sweep_parser.add_argument("setting")
+    sweep_parser.add_argument("values", nargs="+", help="JSON values for the setting")
+    sweep_parser.set_defaults(function=_sweep)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="time a fixed number of generations")
+    benchmark_parser.add_argument("config")
+    benchmark_parser.add_argument("--generations", type=int, default=100)
+    benchmark_parser.add_argument("--repeat", type=int, default=3)
+    benchmark_parser.set_defaults(function=_benchmark)
+
+    worker_parser = subparsers.add_parser("worker", help="evaluate fitnesses for a run started with --listen")
+    worker_parser.add_argument("host")
+    worker_parser.add_argument("port", type=int)
+    worker_parser.add_argument("--heartbeat-interval", type=float, default=1.0)
+    worker_parser.add_argument("--connect-timeout", type=float, default=30.0,
+                               help="seconds to keep retrying while the run isn't listening yet")
+    worker_parser.set_defaults(function=_worker)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> None:
+    parser = create_parser()
+    arguments = parser.parse_args(argv)
+    if getattr(arguments, "plot", False) and arguments.csv is None:
+        parser.error("--plot requires --csv")
+    try:
+        arguments.function(arguments)
+    except InvalidConfigException as e:
+        parser.exit(1, "gp_framework: error: {}\n".format(e))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
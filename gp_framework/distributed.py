@@ -0,0 +1,409 @@
+"""
+Evaluate the fitness of a population on worker processes connected over TCP.
+
+A DistributedEvaluator listens for workers. Each worker (see run_worker) connects, receives the
+PhenotypeConverter and FitnessCalculator once, then receives batches of genomes and answers each batch
+with the fitness of every genome in it. Every message is a frame: a 1 byte message type and a 4 byte
+payload length followed by the payload.
+
+Workers unpickle the configuration the coordinator sends them, so a worker runs whatever code the host it
+connects to chooses. Only point workers at a coordinator you trust, on a network you trust; the protocol has no
+authentication or encryption.
+"""
+import itertools
+import pickle
+import queue
+import socket
+import struct
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Tuple, Dict, Optional
+
+from gp_framework.FitnessCalculator import FitnessCalculator
+from gp_framework.Genotype import Genotype, PhenotypeConverter
+
+_CONFIG = 1
+_BATCH = 2
+_RESULT = 3
+_HEARTBEAT = 4
+_SHUTDOWN = 5
+_ERROR = 6
+
+_FRAME_HEADER = struct.Struct("!BI")
+_BATCH_HEADER = struct.Struct("!II")
+_RESULT_HEADER = struct.Struct("!II")
+_ERROR_HEADER = struct.Struct("!I")
+
+
+class WorkerConnectionException(Exception):
+    pass
+
+
+class NoWorkersException(Exception):
+    pass
+
+
+class RemoteEvaluationException(Exception):
+    """
+    Raised by DistributedEvaluator.evaluate when a worker failed to evaluate a batch. The message is the
+    worker's traceback.
+    """
+    pass
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = connection.recv(size - len(buffer))
+        if not chunk:
+            raise WorkerConnectionException("Connection closed by peer")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def _send_frame(connection: socket.socket, message_type: int, payload: bytes = b"") -> None:
+    connection.sendall(_FRAME_HEADER.pack(message_type, len(payload)) + payload)
+
+
+def _receive_frame(connection: socket.socket) -> Tuple[int, bytes]:
+    message_type, size = _FRAME_HEADER.unpack(_receive_exactly(connection, _FRAME_HEADER.size))
+    return message_type, _receive_exactly(connection, size)
+
+
+def encode_batch(batch_id: int, genomes: List[bytes]) -> bytes:
+    """
+    :param batch_id: identifies the batch so that its result can be matched back up with it
+    :param genomes: the raw bytes of each Genotype in the batch
+    :return: the batch id, the number of genomes, the length of each genome, then the genomes themselves
+    """
+    lengths = struct.pack("!{}I".format(len(genomes)), *[len(genome) for genome in genomes])
+    return _BATCH_HEADER.pack(batch_id, len(genomes)) + lengths + b"".join(genomes)
+
+
+def decode_batch(payload: bytes) -> Tuple[int, List[bytes]]:
+    batch_id, count = _BATCH_HEADER.unpack_from(payload)
+    lengths = struct.unpack_from("!{}I".format(count), payload, _BATCH_HEADER.size)
+    genomes = []
+    offset = _BATCH_HEADER.size + 4 * count
+    for length in lengths:
+        genomes.append(payload[offset:offset + length])
+        offset += length
+    return batch_id, genomes
+
+
+def encode_result(batch_id: int, fitnesses: List[float]) -> bytes:
+    return _RESULT_HEADER.pack(batch_id, len(fitnesses)) + struct.pack("!{}d".format(len(fitnesses)), *fitnesses)
+
+
+def decode_result(payload: bytes) -> Tuple[int, List[float]]:
+    batch_id, count = _RESULT_HEADER.unpack_from(payload)
+    return batch_id, list(struct.unpack_from("!{}d".format(count), payload, _RESULT_HEADER.size))
+
+
+def encode_error(batch_id: int, message: str) -> bytes:
+    return _ERROR_HEADER.pack(batch_id) + message.encode("utf-8")
+
+
+def decode_error(payload: bytes) -> Tuple[int, str]:
+    return _ERROR_HEADER.unpack_from(payload)[0], payload[_ERROR_HEADER.size:].decode("utf-8")
+
+
+class _WorkerHandle:
+    """
+    The coordinator's view of one connected worker
+    """
+    def __init__(self, connection: socket.socket, address):
+        self.connection = connection
+        self.address = address
+        self.last_seen = time.monotonic()
+        self.in_flight: Dict[int, None] = {}
+        self.alive = True
+        self.send_lock = threading.Lock()
+
+
+class DistributedEvaluator:
+    """
+    Hands out batches of genomes to remote workers and collects their fitnesses. Each worker is kept
+    pipeline_depth batches deep so that its next batch is already on the wire while it computes the current
+    one. Workers that disconnect or stop sending heartbeats are dropped and their batches are re-dispatched.
+    """
+    def __init__(self, phenotype_converter: PhenotypeConverter, fitness_calculator: FitnessCalculator,
+                 host: str = "127.0.0.1", port: int = 0, batch_size: int = 32, pipeline_depth: int = 2,
+                 heartbeat_timeout: float = 5.0, worker_wait_timeout: float = 30.0):
+        """
+        :param phenotype_converter: sent to every worker once, when it connects
+        :param fitness_calculator: sent to every worker once, when it connects
+        :param host: interface to listen on
+        :param port: port to listen on. 0 picks a free port, see address
+        :param batch_size: the number of genomes sent to a worker at a time
+        :param pipeline_depth: the number of batches a worker may have outstanding at once
+        :param heartbeat_timeout: seconds of silence after which a worker is considered dead
+        :param worker_wait_timeout: seconds evaluate waits for a worker to connect when there are none
+        """
+        self._config = pickle.dumps((phenotype_converter, fitness_calculator))
+        self._batch_size = batch_size
+        self._pipeline_depth = pipeline_depth
+        self._heartbeat_timeout = heartbeat_timeout
+        self._worker_wait_timeout = worker_wait_timeout
+
+        self._server = socket.create_server((host, port))
+        self._workers: List[_WorkerHandle] = []
+        self._workers_lock = threading.Lock()
+        self._events: queue.Queue = queue.Queue()
+        self._batch_ids = itertools.count()
+        self._closed = False
+        self._accept_thread = threading.Thread(target=self._accept_workers, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.getsockname()[:2]
+
+    @property
+    def worker_count(self) -> int:
+        with self._workers_lock:
+            return len([worker for worker in self._workers if worker.alive])
+
+    def wait_for_workers(self, count: int, timeout: float = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.worker_count < count:
+            if deadline is not None and time.monotonic() > deadline:
+                raise NoWorkersException("Only {} of {} workers connected".format(self.worker_count, count))
+            time.sleep(0.01)
+
+    def _accept_workers(self) -> None:
+        while not self._closed:
+            try:
+                connection, address = self._server.accept()
+            except OSError:
+                return
+            if self._closed:
+                connection.close()
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            worker = _WorkerHandle(connection, address)
+            try:
+                _send_frame(connection, _CONFIG, self._config)
+            except OSError:
+                connection.close()
+                continue
+            with self._workers_lock:
+                self._workers.append(worker)
+            threading.Thread(target=self._read_from_worker, args=(worker,), daemon=True).start()
+            self._events.put(("joined", worker, None))
+
+    def _read_from_worker(self, worker: _WorkerHandle) -> None:
+        try:
+            while True:
+                message_type, payload = _receive_frame(worker.connection)
+                worker.last_seen = time.monotonic()
+                if message_type == _RESULT:
+                    self._events.put(("result", worker, decode_result(payload)))
+                elif message_type == _ERROR:
+                    self._events.put(("error", worker, decode_error(payload)))
+        except (OSError, WorkerConnectionException, struct.error):
+            self._events.put(("died", worker, None))
+
+    def _drop_worker(self, worker: _WorkerHandle, pending: deque) -> None:
+        if not worker.alive:
+            return
+        worker.alive = False
+        pending.extendleft(worker.in_flight)
+        worker.in_flight.clear()
+        with self._workers_lock:
+            self._workers.remove(worker)
+        try:
+            worker.connection.close()
+        except OSError:
+            pass
+
+    def evaluate(self, population: List[Genotype]) -> List[float]:
+        """
+        :param population: the Genotypes to judge
+        :return: the fitness of each member of population, in the same order
+        :raises RemoteEvaluationException: if a worker failed to evaluate part of population. A batch that
+        fails this way is not re-dispatched, since it would fail the same way on any other worker.
+        """
+        batches: Dict[int, Tuple[int, int, bytes]] = {}
+        for start in range(0, len(population), self._batch_size):
+            batch_id = next(self._batch_ids) % 2 ** 32
+            genomes = [genotype.to_bytes() for genotype in population[start:start + self._batch_size]]
+            batches[batch_id] = (start, len(genomes), encode_batch(batch_id, genomes))
+
+        fitnesses: List[Optional[float]] = [None] * len(population)
+        pending = deque(batches)
+        remaining = set(batches)
+        no_workers_since = None
+
+        while remaining:
+            with self._workers_lock:
+                workers = [worker for worker in self._workers if worker.alive]
+
+            now = time.monotonic()
+            for worker in workers:
+                if now - worker.last_seen > self._heartbeat_timeout:
+                    self._drop_worker(worker, pending)
+            workers = [worker for worker in workers if worker.alive]
+
+            if not workers:
+                no_workers_since = no_workers_since or now
+                if now - no_workers_since > self._worker_wait_timeout:
+                    raise NoWorkersException("No workers available to evaluate the population")
+            else:
+                no_workers_since = None
+
+            # Top up every worker to pipeline_depth outstanding batches
+            for worker in workers:
+                while pending and len(worker.in_flight) < self._pipeline_depth:
+                    batch_id = pending.popleft()
+                    if batch_id not in remaining:
+                        continue
+                    try:
+                        with worker.send_lock:
+                            _send_frame(worker.connection, _BATCH, batches[batch_id][2])
+                    except OSError:
+                        pending.appendleft(batch_id)
+                        self._drop_worker(worker, pending)
+                        break
+                    worker.in_flight[batch_id] = None
+
+            try:
+                kind, worker, data = self._events.get(timeout=min(self._heartbeat_timeout / 4, 0.25))
+            except queue.Empty:
+                continue
+            if kind == "died":
+                self._drop_worker(worker, pending)
+            elif kind == "error":
+                batch_id, message = data
+                worker.in_flight.pop(batch_id, None)
+                if batch_id in remaining:
+                    raise RemoteEvaluationException("Worker {} failed to evaluate a batch:\n{}".format(
+                        worker.address, message))
+            elif kind == "result":
+                batch_id, batch_fitnesses = data
+                worker.in_flight.pop(batch_id, None)
+                # A re-dispatched batch may be answered twice; only the first answer counts
+                if batch_id in remaining:
+                    start, count, _ = batches[batch_id]
+                    if len(batch_fitnesses) != count:
+                        raise RemoteEvaluationException("Worker {} answered a batch of {} genomes with {} fitnesses"
+                                                        .format(worker.address, count, len(batch_fitnesses)))
+                    remaining.discard(batch_id)
+                    fitnesses[start:start + count] = batch_fitnesses
+
+        return fitnesses
+
+    def close(self) -> None:
+        """
+        Tell every worker to shut down and stop listening for new ones
+        """
+        self._closed = True
+        # close alone doesn't wake the thread blocked in accept, which would keep accepting workers
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        self._accept_thread.join()
+        with self._workers_lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.alive = False
+            try:
+                with worker.send_lock:
+                    _send_frame(worker.connection, _SHUTDOWN)
+                worker.connection.close()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _connect(host: str, port: int, connect_timeout: float) -> socket.socket:
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run_worker(host: str, port: int, heartbeat_interval: float = 1.0, connect_timeout: float = 0.0) -> None:
+    """
+    Connect to a DistributedEvaluator and evaluate batches until told to shut down or disconnected.
+    Batches are read on a separate thread so the next one arrives while the current one computes.
+    :param host: host of the DistributedEvaluator
+    :param port: port of the DistributedEvaluator
+    :param heartbeat_interval: seconds between heartbeats
+    :param connect_timeout: seconds to keep retrying while the DistributedEvaluator isn't listening yet
+    """
+    connection = _connect(host, port, connect_timeout)
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    send_lock = threading.Lock()
+    stopped = threading.Event()
+    batches: queue.Queue = queue.Queue()
+
+    message_type, payload = _receive_frame(connection)
+    if message_type != _CONFIG:
+        connection.close()
+        raise WorkerConnectionException("Expected configuration, got message type {}".format(message_type))
+    phenotype_converter, fitness_calculator = pickle.loads(payload)
+
+    def send_heartbeats():
+        while not stopped.wait(heartbeat_interval):
+            try:
+                with send_lock:
+                    _send_frame(connection, _HEARTBEAT)
+            except OSError:
+                return
+
+    def receive_batches():
+        try:
+            while True:
+                message_type, payload = _receive_frame(connection)
+                if message_type == _SHUTDOWN:
+                    break
+                if message_type == _BATCH:
+                    batches.put(payload)
+        except (OSError, WorkerConnectionException, struct.error):
+            pass
+        batches.put(None)
+
+    threading.Thread(target=send_heartbeats, daemon=True).start()
+    threading.Thread(target=receive_batches, daemon=True).start()
+
+    try:
+        while True:
+            payload = batches.get()
+            if payload is None:
+                break
+            batch_id, genomes = decode_batch(payload)
+            try:
+                fitnesses = [fitness_calculator.calculate_fitness(
+                    phenotype_converter.convert(Genotype(bytearray(genome)))) for genome in genomes]
+            except Exception:
+                # Report the failure instead of dying, so the coordinator doesn't hand the batch to the next worker
+                with send_lock:
+                    _send_frame(connection, _ERROR, encode_error(batch_id, traceback.format_exc()))
+                continue
+            with send_lock:
+                _send_frame(connection, _RESULT, encode_result(batch_id, fitnesses))
+    except OSError:
+        pass
+    finally:
+        stopped.set()
+        # receive_batches is still blocked in recv, so close alone wouldn't tell the coordinator we're gone
+        try:
+            connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        connection.close()
+
@@ -0,0 +1,161 @@
+"""
+Cheap measures of how varied a population is, and a controller that uses them to tune mutation.
+Every measure here costs O(N*L) for N Genotypes of L bytes, instead of the O(N^2*L) of comparing every pair.
+"""
+import math
+from collections import Counter
+from random import sample
+from typing import List, Tuple
+
+from gp_framework.Genotype import Genotype
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:
+    # int.bit_count is new in Python 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+def mean_hamming_distance(population: List[Genotype], sample_size: int = None) -> float:
+    """
+    Estimate the mean pairwise Hamming distance by XORing sampled pairs of Genotypes and counting the set bits.
+    Each Genotype is packed into a single int, so every XOR and popcount is done over the whole genome at once.
+    :param population: Genotypes of equal length
+    :param sample_size: number of pairs to compare. Defaults to len(population). If there are fewer pairs
+    than this, all of them are compared and the result is exact.
+    :return: the mean fraction of bits that differ between two Genotypes, in [0.0, 1.0]
+    """
+    number_of_genotypes = len(population)
+    if number_of_genotypes < 2 or len(population[0]) == 0:
+        return 0.0
+    if sample_size is None:
+        sample_size = number_of_genotypes
+
+    packed = [int.from_bytes(genotype.to_bytes(), "big") for genotype in population]
+    number_of_pairs = number_of_genotypes * (number_of_genotypes - 1) // 2
+    if number_of_pairs <= sample_size:
+        pairs = [(i, j) for i in range(number_of_genotypes) for j in range(i + 1, number_of_genotypes)]
+    else:
+        pairs = [tuple(sample(range(number_of_genotypes), 2)) for _ in range(sample_size)]
+
+    total_distance = 0
+    for i, j in pairs:
+        total_distance += _popcount(packed[i] ^ packed[j])
+    return total_distance / (len(pairs) * 8 * len(population[0]))
+
+
+def locus_entropy(population: List[Genotype]) -> float:
+    """
+    :param population: Genotypes of equal length
+    :return: the Shannon entropy of the byte values at each locus, averaged over all loci and scaled into
+    [0.0, 1.0] by the most entropy a locus can have in a population of this size. 0.0 means every Genotype has
+    the same byte at every locus, 1.0 means no two Genotypes share a byte at any locus (or, for populations
+    larger than 256, that every byte value is equally common).
+    """
+    if len(population) < 2 or len(population[0]) == 0:
+        return 0.0
+
+    total_entropy = 0.0
+    for locus in zip(*[genotype.to_bytes() for genotype in population]):
+        for count in Counter(locus).values():
+            probability = count / len(population)
+            total_entropy -= probability * math.log2(probability)
+    # A locus holds at most 8 bits of entropy, and no more than log2(N) bits when there are only N Genotypes
+    return total_entropy / (min(8.0, math.log2(len(population))) * len(population[0]))
+
+
+def duplicate_fraction(population: List[Genotype]) -> float:
+    """
+    :return: the fraction of members of population that are redundant copies, i.e. 1 - unique / N. Four
+    identical Genotypes give 0.75, since one of them is not redundant.
+    """
+    if len(population) == 0:
+        return 0.0
+    return 1 - len({genotype.to_bytes() for genotype in population}) / len(population)
+
+
+def calculate_diversity(population: List[Genotype], sample_size: int = None) -> Tuple[float, float, float]:
+    """
+    :return: mean_hamming_distance, locus_entropy and duplicate_fraction of population
+    """
+    return mean_hamming_distance(population, sample_size), locus_entropy(population), \
+        duplicate_fraction(population)
+
+
+class AdaptiveMutationController:
+    """
+    Tunes the mutation_factor between a minimum and a maximum. While the best fitness keeps improving, mutation is
+    lowered so good Genotypes aren't destroyed. Once the best fitness has stalled for stagnation_patience
+    generations and the population has converged (low diversity or many duplicates), mutation is raised so the
+    population keeps exploring. Mutation is also lowered whenever the population is more diverse than
+    maximum_diversity.
+    Call update with each LifecycleReport and pass mutation_factor to Genotype.mutate.
+    """
+    def __init__(self, mutation_factor: float = 0.01, minimum_diversity: float = 0.05,
+                 maximum_diversity: float = 0.25, maximum_duplicate_fraction: float = 0.5,
+                 step: float = 1.2, stagnation_patience: int = 30, minimum_mutation_factor: float = None,
+                 maximum_mutation_factor: float = None):
+        """
+        :param mutation_factor: the starting mutation_factor. Around 1 / (number of bits in a Genotype) works well.
+        :param minimum_diversity: mutation may increase while mean_hamming_distance is below this
+        :param maximum_diversity: mutation decreases while mean_hamming_distance is above this
+        :param maximum_duplicate_fraction: mutation may increase while duplicate_fraction is above this
+        :param step: mutation_factor is multiplied or divided by this on each adjustment
+        :param stagnation_patience: generations without a new best fitness before mutation may increase
+        :param minimum_mutation_factor: mutation_factor never drops below this. Defaults to mutation_factor.
+        :param maximum_mutation_factor: mutation_factor never rises above this. Defaults to twice mutation_factor;
+        much higher rates destroy more progress than they find.
+        """
+        if minimum_mutation_factor is None:
+            minimum_mutation_factor = mutation_factor
+        if maximum_mutation_factor is None:
+            maximum_mutation_factor = 2 * mutation_factor
+        if not minimum_mutation_factor <= mutation_factor <= maximum_mutation_factor:
+            raise ValueError("mutation_factor must be between minimum_mutation_factor and maximum_mutation_factor")
+        if step <= 1:
+            raise ValueError("step must be greater than 1")
+        self._mutation_factor = mutation_factor
+        self._minimum_diversity = minimum_diversity
+        self._maximum_diversity = maximum_diversity
+        self._maximum_duplicate_fraction = maximum_duplicate_fraction
+        self._step = step
+        self._stagnation_patience = stagnation_patience
+        self._minimum_mutation_factor = minimum_mutation_factor
+        self._maximum_mutation_factor = maximum_mutation_factor
+        self._best_fitness = None
+        self._generations_without_improvement = 0
+
+    @property
+    def mutation_factor(self) -> float:
+        return self._mutation_factor
+
+    def update(self, report) -> float:
+        """
+        :param report: the LifecycleReport of the most recent generation
+        :return: the mutation_factor to use for the next generation
+        """
+        improved = self._best_fitness is None or report.max_fitness > self._best_fitness
+        if improved:
+            self._best_fitness = report.max_fitness
+            self._generations_without_improvement = 0
+        else:
+            self._generations_without_improvement += 1
+
+        if report.mean_hamming_distance < 0:
+            # The report has no diversity measurements
+            return self._mutation_factor
+
+        converged = report.mean_hamming_distance < self._minimum_diversity \
+            or report.duplicate_fraction > self._maximum_duplicate_fraction
+        if report.mean_hamming_distance > self._maximum_diversity:
+            self._lower()
+        elif converged and self._generations_without_improvement >= self._stagnation_patience:
+            self._mutation_factor = min(self._mutation_factor * self._step, self._maximum_mutation_factor)
+            self._generations_without_improvement = 0
+        elif improved:
+            self._lower()
+        return self._mutation_factor
+
+    def _lower(self) -> None:
+        self._mutation_factor = max(self._mutation_factor / self._step, self._minimum_mutation_factor)
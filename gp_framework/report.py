@@ -0,0 +1,56 @@
+"""
+Write LifecycleReports to csv files and plot them. plotly is only imported when a plot is made.
+"""
+import csv
+import os
+from typing import List
+
+
+def _make_parent_directory(path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def generate_csv(path: str, header: List[any], rows: List[List[any]]) -> None:
+    """
+    :param path: the csv file to write. Missing directories are created.
+    :param header: the name of each column
+    :param rows: one list of values per row
+    """
+    _make_parent_directory(path)
+    with open(path, 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file, quoting=csv.QUOTE_NONNUMERIC)
+        csv_writer.writerow(header)
+        csv_writer.writerows(rows)
+
+
+def _average_groups(values: List[float], group_size: int) -> List[float]:
+    groups = [values[i:i + group_size] for i in range(0, len(values), group_size)]
+    return [sum(group) / len(group) for group in groups]
+
+
+def generate_plot_from_csv(csv_path: str, plot_path: str, elements_per_point: int = 1, title: str = None) -> None:
+    """
+    Save an html plot with one subplot per column of a csv written by generate_csv
+    :param csv_path: the csv to plot
+    :param plot_path: the html file to write. Missing directories are created.
+    :param elements_per_point: how many rows to average into one point on the plot
+    :param title: appears at the top of the plot. Defaults to csv_path.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    with open(csv_path, 'r', newline='') as csv_file:
+        reader = csv.reader(csv_file, quoting=csv.QUOTE_NONNUMERIC)
+        labels = next(reader)
+        columns = [list(column) for column in zip(*reader)]
+
+    fig = make_subplots(rows=len(labels), cols=1, subplot_titles=labels)
+    for i, column in enumerate(columns):
+        points = _average_groups(column, elements_per_point)
+        fig.add_trace(go.Scatter(x=list(range(len(points))), y=points), row=i + 1, col=1)
+    fig.update_layout(height=300 * len(labels), title_text=title if title is not None else csv_path)
+
+    _make_parent_directory(plot_path)
+    fig.write_html(plot_path)
@@ -0,0 +1,14 @@
+import random
+
+import pytest
+
+
+@pytest.fixture
+def seeded_random():
+    """
+    Seed the global random number generator for the test, and put back its previous state afterwards
+    """
+    state = random.getstate()
+    random.seed(0)
+    yield
+    random.setstate(state)
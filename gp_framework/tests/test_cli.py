@@ -0,0 +1,192 @@
+import base64
+import json
+import pickle
+import socket
+import subprocess
+import sys
+import time
+import types
+
+import pytest
+
+from gp_framework import cli
+
+# Using Test Framework pytest
+
+IMPORT_TIME_BUDGET = 0.2
+STARTUP_TIME_BUDGET = 0.5
+# Only the subcommands that need these may import them
+DEFERRED_MODULES = ["plotly", "jsonpickle", "alexsandbox", "gp_framework.distributed", "gp_framework.report",
+                    "gp_framework.serializer"]
+
+SETTINGS = {
+    "application": "STRING_MATCH",
+    # long enough that no test run finds the solution and stops early
+    "application_arguments": ["hello world"],
+    "size_of_genotype": 11,
+    "population_size": 5,
+    "generations": 20,
+}
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(SETTINGS))
+    return str(path)
+
+
+def test_import_skips_heavy_dependencies():
+    script = "import json, sys, time\n" \
+             "start = time.perf_counter()\n" \
+             "import gp_framework.cli\n" \
+             "print(time.perf_counter() - start)\n" \
+             "print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+    import_time, modules = output.splitlines()
+    assert float(import_time) < IMPORT_TIME_BUDGET
+    imported = [module for module in json.loads(modules)
+                if any(module == deferred or module.startswith(deferred + ".") for deferred in DEFERRED_MODULES)]
+    assert imported == []
+
+
+def test_headless_startup_time_budget():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "gp_framework", "--help"], capture_output=True, check=True)
+    assert time.perf_counter() - start < STARTUP_TIME_BUDGET
+
+
+def test_build_config():
+    config = cli.build_config(SETTINGS)
+    assert config.size_of_genotype == 11
+    assert config.bit_string_length == 88
+    assert config.application == cli.Application.STRING_MATCH
+
+    with pytest.raises(cli.InvalidConfigException):
+        cli.build_config({"size_of_genotype": 5, "application": "NOT_AN_APPLICATION"})
+
+
+@pytest.mark.parametrize("override, message", [
+    ({"application_arguments": None}, "application_arguments"),
+    ({"phenotype": "parameters"}, "number_of_parameters"),
+    ({"phenotype": "tree"}, "Unknown phenotype"),
+    ({"manager": "no_such_module:Manager"}, "Could not load manager"),
+    ({"manager": "gp_framework.PopulationManager:NoSuchManager"}, "Could not load manager"),
+    ({"manager": "gp_framework.cli:main"}, "is not a PopulationManager"),
+    ({"population_size": 0}, "population_size must be an integer of at least 1"),
+    ({"population_size": "ten"}, "population_size must be an integer of at least 1"),
+    ({"generations": -1}, "generations must be an integer of at least 0"),
+    ({"generations": 2.5}, "generations must be an integer of at least 0"),
+    ({"size_of_genotype": 5}, "size_of_genotype must be 11"),
+])
+def test_invalid_config_exits_with_message(tmp_path, capsys, override, message):
+    settings = dict(SETTINGS)
+    settings.update(override)
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({key: value for key, value in settings.items() if value is not None}))
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["run", str(path)])
+    assert exit_info.value.code == 1
+    assert message in capsys.readouterr().err
+
+
+def test_run(config_file, capsys):
+    cli.main(["run", config_file])
+    assert capsys.readouterr().out.startswith("20 generations")
+
+
+def test_run_writes_csv_without_existing_directory(config_file, tmp_path):
+    csv_path = tmp_path / "reports" / "run.csv"
+    cli.main(["run", config_file, "--csv", str(csv_path)])
+    lines = csv_path.read_text().splitlines()
+    assert len(lines) == 21
+    assert lines[0].startswith('"max_fitness"')
+
+
+def test_plot_requires_csv(config_file, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["run", config_file, "--plot"])
+    assert exit_info.value.code == 2
+    assert "--plot requires --csv" in capsys.readouterr().err
+
+
+def test_run_with_workers(config_file, capsys):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    worker = subprocess.Popen([sys.executable, "-m", "gp_framework", "worker", "127.0.0.1", str(port)])
+    try:
+        cli.main(["run", config_file, "--listen", "127.0.0.1:{}".format(port), "--workers", "1"])
+    finally:
+        assert worker.wait(timeout=10) == 0
+    assert capsys.readouterr().out.startswith("20 generations")
+
+
+def test_sweep_rejects_invalid_json(config_file, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["sweep", config_file, "generations", "abc"])
+    assert exit_info.value.code == 1
+    assert "Value abc for generations is not valid JSON" in capsys.readouterr().err
+
+
+def test_sweep(config_file, capsys):
+    cli.main(["sweep", config_file, "population_size", "2", "4"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("population_size=2")
+    assert lines[1].startswith("population_size=4")
+
+
+@pytest.fixture
+def pickle_serializer(monkeypatch):
+    """
+    Stands in for gp_framework.serializer, so checkpoints can be tested without jsonpickle installed
+    """
+    import gp_framework
+    serializer = types.ModuleType("gp_framework.serializer")
+    serializer.serialize = lambda obj: base64.b64encode(pickle.dumps(obj)).decode("ascii")
+    serializer.deserialize = lambda json_string: pickle.loads(base64.b64decode(json_string))
+    monkeypatch.setitem(sys.modules, "gp_framework.serializer", serializer)
+    monkeypatch.setattr(gp_framework, "serializer", serializer, raising=False)
+
+
+def test_checkpoint_and_resume_generation_counts(config_file, tmp_path, capsys, pickle_serializer):
+    checkpoint = str(tmp_path / "checkpoint")
+    cli.main(["run", config_file, "--checkpoint", checkpoint, "--checkpoint-every", "7"])
+    assert cli._load_checkpoint(checkpoint)[2] == 20
+
+    cli.main(["resume", checkpoint, "--generations", "30"])
+    _, settings, generation = cli._load_checkpoint(checkpoint)
+    assert generation == 30
+    assert settings == SETTINGS
+
+    # Already at the requested number of generations, so there is nothing left to run
+    cli.main(["resume", checkpoint, "--generations", "30"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("20 generations")
+    assert lines[1].startswith("10 generations")
+    assert lines[2] == "0 generations"
+    assert cli._load_checkpoint(checkpoint)[2] == 30
+
+
+def test_failed_checkpoint_write_keeps_previous_checkpoint(config_file, tmp_path, monkeypatch, pickle_serializer):
+    checkpoint = tmp_path / "checkpoint"
+    cli.main(["run", config_file, "--checkpoint", str(checkpoint)])
+    previous = checkpoint.read_text()
+
+    def killed_mid_write(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli.os, "replace", killed_mid_write)
+    with pytest.raises(KeyboardInterrupt):
+        cli._save_checkpoint(str(checkpoint), cli.build_manager(SETTINGS), SETTINGS, 5)
+    assert checkpoint.read_text() == previous
+    assert cli._load_checkpoint(str(checkpoint))[2] == 20
+
+
+def test_checkpoint_and_resume(config_file, tmp_path, capsys):
+    pytest.importorskip("jsonpickle")
+    checkpoint = str(tmp_path / "checkpoint.json")
+    cli.main(["run", config_file, "--checkpoint", checkpoint])
+    cli.main(["resume", checkpoint, "--generations", "30"])
+    assert capsys.readouterr().out.splitlines()[1].startswith("10 generations")
@@ -0,0 +1,203 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from gp_framework import distributed
+from gp_framework.FitnessCalculator import FitnessCalculatorStringMatch
+from gp_framework.Genotype import Genotype, StringPhenotypeConverter, generate_random_population
+from gp_framework.PopulationManager import PopulationManager
+
+# Using Test Framework pytest
+
+
+def _local_fitnesses(population, phenotype_converter, fitness_calculator):
+    return [fitness_calculator.calculate_fitness(phenotype_converter.convert(genotype)) for genotype in population]
+
+
+def _start_worker(evaluator, **kwargs) -> threading.Thread:
+    host, port = evaluator.address
+    thread = threading.Thread(target=distributed.run_worker, args=(host, port), kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_batch_round_trip():
+    genomes = [b"abcd", b"", b"\x00\xff"]
+    assert distributed.decode_batch(distributed.encode_batch(7, genomes)) == (7, genomes)
+    assert distributed.decode_result(distributed.encode_result(7, [1.0, 2.5])) == (7, [1.0, 2.5])
+
+
+def test_evaluate_matches_local_evaluation():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = FitnessCalculatorStringMatch(["hello"])
+    population = generate_random_population(50, 5)
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4) as evaluator:
+        _start_worker(evaluator)
+        _start_worker(evaluator)
+        evaluator.wait_for_workers(2, timeout=5)
+        for _ in range(3):
+            assert evaluator.evaluate(population) == \
+                _local_fitnesses(population, phenotype_converter, fitness_calculator)
+
+
+def test_evaluate_redispatches_batches_of_dead_worker():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = FitnessCalculatorStringMatch(["hello"])
+    population = generate_random_population(20, 5)
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4) as evaluator:
+        # This worker takes the configuration and a batch, then dies without answering
+        dying_worker = socket.create_connection(evaluator.address)
+        evaluator.wait_for_workers(1, timeout=5)
+
+        def kill_after_first_batch():
+            distributed._receive_frame(dying_worker)
+            distributed._receive_frame(dying_worker)
+            dying_worker.close()
+            _start_worker(evaluator)
+
+        threading.Thread(target=kill_after_first_batch, daemon=True).start()
+        assert evaluator.evaluate(population) == \
+            _local_fitnesses(population, phenotype_converter, fitness_calculator)
+
+
+def test_evaluate_drops_silent_worker():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = FitnessCalculatorStringMatch(["hello"])
+    population = generate_random_population(8, 5)
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4,
+                                          heartbeat_timeout=0.5) as evaluator:
+        # Connected, but never heartbeats or answers
+        silent_worker = socket.create_connection(evaluator.address)
+        evaluator.wait_for_workers(1, timeout=5)
+        _start_worker(evaluator, heartbeat_interval=0.1)
+        assert evaluator.evaluate(population) == \
+            _local_fitnesses(population, phenotype_converter, fitness_calculator)
+        silent_worker.close()
+
+
+def test_worker_process_with_population_manager():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = FitnessCalculatorStringMatch(["hello"])
+    population = generate_random_population(10, 5)
+
+    class Manager(PopulationManager):
+        def produce_offspring(self, population):
+            return population, population
+
+        def select_next_generation(self, parents, children):
+            return children
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator) as evaluator:
+        host, port = evaluator.address
+        worker = subprocess.Popen([sys.executable, "-m", "gp_framework", "worker", host, str(port)])
+        try:
+            evaluator.wait_for_workers(1, timeout=30)
+            manager = Manager(population, phenotype_converter, fitness_calculator, evaluator)
+            judged_population, report = manager.calculate_population_fitness(population)
+        finally:
+            evaluator.close()
+            worker.wait(timeout=10)
+
+    expected = _local_fitnesses(population, phenotype_converter, fitness_calculator)
+    assert [fitness for _, fitness in judged_population] == expected
+    assert report.max_fitness == max(expected)
+
+
+class _FailingFitnessCalculator(FitnessCalculatorStringMatch):
+    def calculate_fitness(self, phenotype, application_arguments=None):
+        if phenotype == "BBBBB":
+            raise ValueError("cannot judge {}".format(phenotype))
+        return super().calculate_fitness(phenotype, application_arguments)
+
+
+_crash_armed = threading.Event()
+
+
+class _CrashOnceFitnessCalculator(FitnessCalculatorStringMatch):
+    def calculate_fitness(self, phenotype, application_arguments=None):
+        if _crash_armed.is_set():
+            _crash_armed.clear()
+            # Not an Exception, so it isn't reported as an evaluation error and takes the worker down
+            raise SystemExit
+        return super().calculate_fitness(phenotype, application_arguments)
+
+
+def test_evaluate_raises_remote_error_without_killing_workers():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = _FailingFitnessCalculator(["hello"])
+    population = generate_random_population(8, 5) + [Genotype(bytearray(b"BBBBB"))]
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4) as evaluator:
+        _start_worker(evaluator)
+        _start_worker(evaluator)
+        evaluator.wait_for_workers(2, timeout=5)
+        start = time.monotonic()
+        with pytest.raises(distributed.RemoteEvaluationException, match="ValueError: cannot judge BBBBB"):
+            evaluator.evaluate(population)
+        assert time.monotonic() - start < 2
+        assert evaluator.worker_count == 2
+        assert evaluator.evaluate(population[:8]) == \
+            _local_fitnesses(population[:8], phenotype_converter, fitness_calculator)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_evaluate_redispatches_promptly_after_worker_crash():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = _CrashOnceFitnessCalculator(["hello"])
+    population = generate_random_population(8, 5)
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4,
+                                          heartbeat_timeout=30) as evaluator:
+        workers = [_start_worker(evaluator), _start_worker(evaluator)]
+        evaluator.wait_for_workers(2, timeout=5)
+        _crash_armed.set()
+        start = time.monotonic()
+        fitnesses = evaluator.evaluate(population)
+        # Far sooner than heartbeat_timeout, so the coordinator must have seen the connection close
+        assert time.monotonic() - start < 2
+        assert not _crash_armed.is_set()
+        for worker in workers:
+            worker.join(timeout=0.1)
+        assert len([worker for worker in workers if worker.is_alive()]) == 1
+        assert evaluator.worker_count == 1
+
+    assert fitnesses == [fitness_calculator.calculate_fitness(phenotype_converter.convert(genotype))
+                         for genotype in population]
+
+
+def test_close_stops_listening():
+    evaluator = distributed.DistributedEvaluator(StringPhenotypeConverter(), FitnessCalculatorStringMatch(["hello"]))
+    address = evaluator.address
+    evaluator.close()
+    assert not evaluator._accept_thread.is_alive()
+    with pytest.raises(OSError):
+        socket.create_connection(address, timeout=1).close()
+
+
+def test_evaluate_rejects_result_of_wrong_length():
+    phenotype_converter = StringPhenotypeConverter()
+    fitness_calculator = FitnessCalculatorStringMatch(["hello"])
+    population = generate_random_population(4, 5)
+
+    with distributed.DistributedEvaluator(phenotype_converter, fitness_calculator, batch_size=4) as evaluator:
+        # This worker answers every batch with a single fitness
+        short_worker = socket.create_connection(evaluator.address)
+        evaluator.wait_for_workers(1, timeout=5)
+
+        def answer_short():
+            distributed._receive_frame(short_worker)
+            _, payload = distributed._receive_frame(short_worker)
+            batch_id, _ = distributed.decode_batch(payload)
+            distributed._send_frame(short_worker, distributed._RESULT, distributed.encode_result(batch_id, [1.0]))
+
+        threading.Thread(target=answer_short, daemon=True).start()
+        with pytest.raises(distributed.RemoteEvaluationException, match="batch of 4 genomes with 1 fitnesses"):
+            evaluator.evaluate(population)
+        short_worker.close()
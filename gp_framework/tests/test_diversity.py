@@ -0,0 +1,117 @@
+from operator import itemgetter
+
+import pytest
+
+from gp_framework import diversity
+from gp_framework.FitnessCalculator import FitnessCalculatorStringMatch
+from gp_framework.Genotype import Genotype, StringPhenotypeConverter, generate_random_population
+from gp_framework.PopulationManager import LifecycleReport, PopulationManager
+
+# Using Test Framework pytest
+
+
+def _population(*genomes: bytes):
+    return [Genotype(bytearray(genome)) for genome in genomes]
+
+
+def test_mean_hamming_distance_exact_for_small_population():
+    population = _population(b"\x00\x00", b"\xff\x00", b"\x0f\x00")
+    # pairwise distances are 8, 4 and 4 bits out of 16
+    assert diversity.mean_hamming_distance(population) == pytest.approx(16 / 3 / 16)
+
+
+def test_mean_hamming_distance_estimate_of_random_population():
+    population = generate_random_population(500, 16)
+    assert diversity.mean_hamming_distance(population, sample_size=2000) == pytest.approx(0.5, abs=0.05)
+
+
+def test_converged_population_has_no_diversity():
+    population = _population(b"abc", b"abc", b"abc", b"abc")
+    assert diversity.calculate_diversity(population) == (0.0, 0.0, 0.75)
+
+
+def test_locus_entropy():
+    # one locus evenly split between two values (the 1 bit maximum for two Genotypes), the other fixed
+    population = _population(b"\x00\x07", b"\x01\x07")
+    assert diversity.locus_entropy(population) == pytest.approx(0.5)
+    assert diversity.duplicate_fraction(population) == 0.0
+
+
+def test_locus_entropy_is_comparable_across_population_sizes():
+    assert diversity.locus_entropy(_population(*[bytes([i, 255 - i]) for i in range(10)])) == pytest.approx(1.0)
+    assert diversity.locus_entropy(_population(*[bytes([i, 255 - i]) for i in range(256)])) == pytest.approx(1.0)
+    assert diversity.locus_entropy(_population(b"ab")) == 0.0
+
+
+def test_popcount():
+    assert diversity._popcount(0b1011) == 3
+    assert diversity._popcount(0) == 0
+
+
+def test_adaptive_mutation_controller():
+    controller = diversity.AdaptiveMutationController(0.01, step=2, stagnation_patience=2,
+                                                      maximum_mutation_factor=0.03)
+
+    def report(max_fitness, mean_hamming_distance, duplicate_fraction):
+        return LifecycleReport(max_fitness=max_fitness, mean_hamming_distance=mean_hamming_distance,
+                               duplicate_fraction=duplicate_fraction)
+
+    # Converged, but only raised once the best fitness has stalled for stagnation_patience generations
+    assert controller.update(report(10, 0.0, 1.0)) == pytest.approx(0.01)
+    assert controller.update(report(10, 0.0, 1.0)) == pytest.approx(0.01)
+    assert controller.update(report(10, 0.0, 1.0)) == pytest.approx(0.02)
+    assert controller.update(report(10, 0.0, 1.0)) == pytest.approx(0.02)
+    assert controller.update(report(10, 0.0, 1.0)) == pytest.approx(0.03)
+
+    # Stalled, but the population is diverse enough already
+    assert controller.update(report(10, 0.1, 0.0)) == pytest.approx(0.03)
+    assert controller.update(report(10, 0.1, 0.0)) == pytest.approx(0.03)
+
+    # A new best fitness, or too much diversity, lowers it
+    assert controller.update(report(11, 0.1, 0.0)) == pytest.approx(0.015)
+    assert controller.update(report(11, 0.5, 0.0)) == pytest.approx(0.01)
+    assert controller.update(LifecycleReport()) == pytest.approx(0.01)
+
+
+class _CloneFittestManager(PopulationManager):
+    """
+    The clone-the-best strategy of alexsandbox's MyManager: no elite, every child is a mutated copy of the best
+    """
+    def __init__(self, population, phenotype_converter, fitness_calculator, mutation_factor):
+        super().__init__(population, phenotype_converter, fitness_calculator)
+        self.mutation_factor = mutation_factor
+
+    def produce_offspring(self, population):
+        judged_population, self._newest_report = self.calculate_population_fitness(population)
+        mutation_factor = self.mutation_factor(self._newest_report)
+        fittest_individual = max(judged_population, key=itemgetter(1))[0]
+        children = []
+        for _ in range(len(population)):
+            child = Genotype(bytearray(fittest_individual.to_bytes()))
+            child.mutate(mutation_factor)
+            children.append(child)
+        return population, children
+
+    def select_next_generation(self, parents, children):
+        return children
+
+
+def _generations_to_target(mutation_factor, target: str, maximum_generations: int) -> int:
+    manager = _CloneFittestManager(generate_random_population(10, len(target)), StringPhenotypeConverter(),
+                                   FitnessCalculatorStringMatch([target]), mutation_factor)
+    for generation in range(maximum_generations):
+        if manager.lifecycle().solution_found:
+            return generation
+    return maximum_generations
+
+
+def test_adaptive_mutation_reaches_target_sooner_than_fixed_rate(seeded_random):
+    target = "hey"
+    one_bit = 1 / (8 * len(target))
+    runs = 20
+    fixed = [_generations_to_target(lambda report: one_bit, target, 1500) for _ in range(runs)]
+    adaptive = [_generations_to_target(diversity.AdaptiveMutationController(one_bit).update, target, 1500)
+                for _ in range(runs)]
+    # Over many more runs the adaptive rate takes about a third as many generations
+    assert sum(adaptive) < 0.75 * sum(fixed)
+    assert adaptive.count(1500) <= fixed.count(1500)
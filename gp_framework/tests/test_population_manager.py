@@ -0,0 +1,42 @@
+from gp_framework.FitnessCalculator import FitnessCalculatorStringMatch
+from gp_framework.Genotype import Genotype, StringPhenotypeConverter, generate_random_population
+from gp_framework.PopulationManager import PopulationManager, ElitistMutationManager
+
+# Using Test Framework pytest
+
+
+class _KeepEveryoneManager(PopulationManager):
+    def produce_offspring(self, population):
+        return population, population
+
+    def select_next_generation(self, parents, children):
+        return children
+
+
+def test_solution_found_compares_against_target_fitness():
+    manager = _KeepEveryoneManager([], StringPhenotypeConverter(), FitnessCalculatorStringMatch(["hello"]))
+
+    _, report = manager.calculate_population_fitness([Genotype(bytearray(b"hello")), Genotype(bytearray(b"hellp"))])
+    assert report.max_fitness == 635
+    assert report.solution_found
+
+    _, report = manager.calculate_population_fitness([Genotype(bytearray(b"hellp"))])
+    assert not report.solution_found
+
+
+def test_elitist_mutation_manager_improves_towards_target_fitness():
+    fitness_calculator = FitnessCalculatorStringMatch(["hi"])
+    manager = ElitistMutationManager(generate_random_population(10, 2), StringPhenotypeConverter(),
+                                     fitness_calculator)
+    first_fitness = manager.lifecycle().max_fitness
+    best_fitness = first_fitness
+    for _ in range(1000):
+        report = manager.lifecycle()
+        # The fittest Genotype is always kept, so the best fitness never goes down
+        assert report.max_fitness >= best_fitness
+        best_fitness = report.max_fitness
+        if report.solution_found:
+            break
+    assert best_fitness > first_fitness or best_fitness == fitness_calculator.target_fitness
+    # Adjacent characters can be several bit flips apart, so a run may still be a step short of the target
+    assert best_fitness >= fitness_calculator.target_fitness - 2
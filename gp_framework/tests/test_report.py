@@ -0,0 +1,29 @@
+import csv
+
+import pytest
+
+from gp_framework import report as rep
+
+# Using Test Framework pytest
+
+
+def test_average_groups():
+    assert rep._average_groups([i * 2 for i in range(10)], 2) == [1, 5, 9, 13, 17]
+    assert rep._average_groups([i for i in range(10)], 3) == [1, 4, 7, 9]
+
+
+def test_generate_csv_creates_directories(tmp_path):
+    path = tmp_path / "a" / "b" / "reports.csv"
+    rep.generate_csv(str(path), ["x", "y"], [[1, 2.5], [3, 4]])
+    with open(path, newline='') as csv_file:
+        rows = list(csv.reader(csv_file, quoting=csv.QUOTE_NONNUMERIC))
+    assert rows == [["x", "y"], [1, 2.5], [3, 4]]
+
+
+def test_generate_plot_from_csv(tmp_path):
+    pytest.importorskip("plotly")
+    csv_path = str(tmp_path / "reports.csv")
+    plot_path = tmp_path / "plots" / "reports.html"
+    rep.generate_csv(csv_path, ["x", "y"], [[i, i * i] for i in range(10)])
+    rep.generate_plot_from_csv(csv_path, str(plot_path), elements_per_point=2)
+    assert plot_path.exists()